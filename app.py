@@ -1,30 +1,30 @@
 """Multipage Streamlit app for UGo Transportation analysis."""
 
-import json
 import math
-import os
 import re
 
 import altair as alt
+import numpy as np
 import pandas as pd
+import pydeck as pdk
 import streamlit as st
-import streamlit.components.v1 as components
-from dotenv import load_dotenv
 
 from src.utils.data_cleaning import load_data
 from src.utils.load import (
+    DAY_NAMES,
+    add_headways,
     add_time_blocks,
     add_traffic_flag,
     aggregate_by_time,
     assign_expected_frequencies,
     load_holdover_data,
     load_stop_events,
-    process_arrival_times,
+    process_arrival_times_for_frequency,
+    source_fingerprint,
+    source_mtime,
     time_extraction,
 )
 
-load_dotenv()
-
 # ── Page config & startup ───────────────────────────────────────────────────
 st.set_page_config(page_title="UGo Shuttle Analysis Dashboard", layout="wide")
 st.sidebar.markdown(
@@ -47,6 +47,27 @@ def startup():
 
 startup()
 
+
+def load_prepared_events():
+    """Return stop events with time blocks and traffic flags, built once per data version."""
+    data_version = source_mtime()
+    if st.session_state.get("events_prep_version") != data_version:
+        st.session_state.events_prep_version = data_version
+        st.session_state.events_prep = add_traffic_flag(
+            add_time_blocks(
+                load_stop_events(
+                    columns=[
+                        "routeName",
+                        "stopName",
+                        "arrivalTime",
+                        "stopDurationSeconds",
+                    ]
+                )
+            )
+        )
+    return st.session_state.events_prep
+
+
 page = st.sidebar.radio(
     "Select Analysis Page:",
     [
@@ -64,12 +85,19 @@ page = st.sidebar.radio(
 
 
 # ── Normalization helpers ────────────────────────────────────────────────────
+_RE_BRACKETS = re.compile(r"\[.*?\]\s*")
+_RE_VERSION = re.compile(r"\(version.*?\)", re.IGNORECASE)
+_RE_PARENS = re.compile(r"\(.*?\)")
+_RE_NONWORD = re.compile(r"[^a-z0-9\.\s]")
+_RE_WS = re.compile(r"\s+")
+
+
 def normalize_route(r: str) -> str:
     """Turn a raw route string into a lowercase key without prefixes/suffixes."""
     if not isinstance(r, str):
         return ""
-    r = re.sub(r"\[.*?\]\s*", "", r)
-    r = re.sub(r"\(version.*?\)", "", r, flags=re.IGNORECASE)
+    r = _RE_BRACKETS.sub("", r)
+    r = _RE_VERSION.sub("", r)
     return r.strip().lower()
 
 
@@ -78,10 +106,183 @@ def normalize_stop(s: str) -> str:
     if not isinstance(s, str):
         return ""
     s = s.lower()
-    s = re.sub(r"\(.*?\)", "", s)
+    s = _RE_PARENS.sub("", s)
     s = s.replace("&", " and ").replace("/", " and ")
-    s = re.sub(r"[^a-z0-9\.\s]", "", s)
-    return re.sub(r"\s+", " ", s).strip()
+    s = _RE_NONWORD.sub("", s)
+    return _RE_WS.sub(" ", s).strip()
+
+
+# ── Bunching palette (viridis, light ➟ dark) over fixed 10 % buckets ────────
+BUNCHING_COLORS = np.array(
+    ["#FDE725", "#B4DE2C", "#6DCD59", "#35B779", "#1F9E89", "#31688E", "#440154"]
+)
+BUNCHING_BREAKS = np.arange(0, 80, 10)
+BUNCHING_RGBA = np.array(
+    [[int(c[i : i + 2], 16) for i in (1, 3, 5)] + [204] for c in BUNCHING_COLORS]
+)
+BUNCHING_LEGEND_HTML = "<b>Bunching&nbsp;(%)</b><br>" + "<br>".join(
+    f"<span style='display:inline-block;width:18px;height:10px;"
+    f"background:{color};margin-right:4px'></span>"
+    + (f"{lower}–{upper}" if i < len(BUNCHING_COLORS) - 1 else f"≥ {lower}")
+    for i, (color, lower, upper) in enumerate(
+        zip(BUNCHING_COLORS, BUNCHING_BREAKS, BUNCHING_BREAKS[1:])
+    )
+)
+
+
+def bunching_fill(pct: pd.Series) -> np.ndarray:
+    """Map bunching percentages to RGBA fill colours with a palette lookup."""
+    bucket = np.searchsorted(BUNCHING_BREAKS[1:], pct.to_numpy(), side="right")
+    return BUNCHING_RGBA[np.minimum(bucket, len(BUNCHING_COLORS) - 1)]
+
+
+# ── Stop Wait aggregates ───────────────────────────────────────────────────
+@st.cache_data(show_spinner=False)
+def stop_wait_aggregates(
+    _df_events: pd.DataFrame,
+    route: str,
+    stops: tuple,
+    time_block: str,
+    data_version: int,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Return average stop durations by stop (with holdover flag) and by time block.
+
+    The prepared events frame is not hashed; the selections and data version
+    identify the result.
+    """
+    # filter to the selections & convert durations
+    route_code = _df_events["routeName"].cat.categories.get_loc(route)
+    stop_codes = _df_events["stopName"].cat.categories.get_indexer(list(stops))
+    time_block_code = _df_events["timeBlock"].cat.categories.get_loc(time_block)
+    mask = (
+        (_df_events["routeName"].cat.codes.to_numpy() == route_code)
+        & (_df_events["timeBlock"].cat.codes.to_numpy() == time_block_code)
+        & np.isin(_df_events["stopName"].cat.codes.to_numpy(), stop_codes)
+    )
+    filtered_events = _df_events[mask].assign(
+        stopDurationMinutes=lambda d: d["stopDurationSeconds"] / 60
+    )
+
+    # drop the slowest 5 % as outliers
+    thr = filtered_events["stopDurationMinutes"].quantile(0.95)
+    core = filtered_events[filtered_events["stopDurationMinutes"] <= thr]
+
+    # holdover lookup
+    # 1) normalize both sides
+    route_key = core["routeName"].apply(normalize_route).astype(object)
+    stop_key = (
+        core["stopName"]
+        .apply(normalize_stop)
+        .astype(object)
+        .replace(
+            {
+                "logan cneter": "logan center for arts",
+                "logan center": "logan center for arts",
+                "drexel garage": "drexel garage",
+            }
+        )
+    )
+
+    hold = load_holdover_data()
+    hold["route_key"] = hold["route"].apply(normalize_route)
+    hold["stop_key"] = hold["holdover_stop"].apply(normalize_stop)
+
+    # 2) patch special cases twice (typo + proper name)
+    special = {
+        "law": "law school",
+        "goldblatt pavillion": "goldblatt pavilion",
+        "60th and ellis": "60th st. and ellis",
+        "logan cneter": "logan center for arts",
+        "logan center": "logan center for arts",
+    }
+    hold["stop_key"] = hold["stop_key"].replace(special)
+    hold["stop_key"] = hold["stop_key"].replace(special)
+
+    # 3) hash lookup of holdover minutes by (route, stop) & flag
+    hold_minutes = hold.set_index(["route_key", "stop_key"])["durationMinutes"]
+    minutes = hold_minutes.reindex(pd.MultiIndex.from_arrays([route_key, stop_key]))
+    merged = core.assign(isHoldover=minutes.fillna(0).to_numpy() > 0)
+
+    avg_stop = (
+        merged.groupby(["stopName", "isHoldover"], observed=True)["stopDurationMinutes"]
+        .mean()
+        .reset_index()
+        .sort_values("stopDurationMinutes", ascending=False)
+    )
+
+    avg_time = (
+        filtered_events.groupby("timeBlock", observed=True)["stopDurationMinutes"]
+        .mean()
+        .reset_index()
+    )
+    return avg_stop, avg_time
+
+
+# ── Downtown Connector stop coordinates ──────────────────────────────────────
+CONNECTOR_STOP_COORDS = {
+    "Gleacher Center": (41.88964, -87.62196),
+    "Rockefeller Chapel": (41.78779, -87.59664),
+    "E Randolph St & S Michigan Ave": (41.88430, -87.62383),
+    "S Michigan Ave/Roosevelt": (41.86795, -87.62397),
+    "S (Upper) Wacker Dr & W Adams St": (41.87950, -87.63701),
+    "S Lake Park Ave & E Hyde Park Blvd": (41.80279, -87.58782),
+    "N (Upper) Wacker Dr & W Madison St": (41.88205, -87.63712),
+    "S Lake Park & E 53rd St": (41.79952, -87.58716),
+    "55th Street & University": (41.79497, -87.59787),
+    "UCHICAGO Medicine - River East": (41.89192, -87.61817),
+    "Goldblatt Pavilion": (41.78778, -87.60380),
+    "UCHICAGO Medicine - South Loop": (41.86968, -87.63950),
+    "Roosevelt Station": (41.86729, -87.62686),
+}
+
+
+@st.cache_data(show_spinner=False)
+def scheduled_frequencies(data_version: int) -> np.ndarray:
+    """Return the sorted expected frequencies (minutes) present in the stop events."""
+    stop_events_df = assign_expected_frequencies(
+        load_stop_events(columns=["routeName", "arrivalTime"])
+    )
+    return np.sort(stop_events_df["expectedFreq"].dropna().astype(int).unique())
+
+
+@st.cache_data(show_spinner=False)
+def connector_headways(route: str, data_version: int) -> pd.DataFrame:
+    """Return headways for every stop event on a route, across all hours."""
+    base_df = assign_expected_frequencies(
+        load_stop_events(columns=["routeName", "stopName", "arrivalTime"])
+    )
+    base_df = base_df[base_df["routeName"].str.contains(route, na=False)]
+    return add_headways(base_df, ["stopName"]).dropna(
+        subset=["headway_min", "expectedFreq"]
+    )
+
+
+@st.cache_data(show_spinner=False)
+def connector_bunching(
+    hr_start: int, hr_end: int, route: str, data_version: int
+) -> pd.DataFrame:
+    """Return per-stop bunching rates, coordinates and colours for an hour range."""
+    base_df = connector_headways(route, data_version)
+    sub_df = base_df[base_df["arrivalTime"].dt.hour.between(hr_start, hr_end)]
+    bunch_sub = (
+        sub_df.assign(is_bunched=sub_df["headway_min"] < 0.5 * sub_df["expectedFreq"])
+        .groupby("stopName", observed=True)["is_bunched"]
+        .mean()
+        .reset_index(name="bunching_rate")
+    )
+    coord_df = (
+        pd.DataFrame.from_dict(
+            CONNECTOR_STOP_COORDS, orient="index", columns=["lat", "lon"]
+        )
+        .reset_index()
+        .rename(columns={"index": "stopName"})
+    )
+    plot_df = (
+        bunch_sub.merge(coord_df, on="stopName", how="left")
+        .dropna(subset=["lat", "lon"])
+        .assign(pct=lambda d: (d["bunching_rate"] * 100).round(1))
+    )
+    return plot_df.assign(color=bunching_fill(plot_df["pct"]).tolist())
 
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -143,7 +344,7 @@ elif page == "About":
     ### Tools Used
     - Streamlit
     - Python
-    - Google Maps API
+    - pydeck
 
     """)
 
@@ -167,18 +368,17 @@ elif page == "Stop Wait Patterns":
     """)
 
     # ── Data load ─────────────────────────────────────────────────────────────
-    df_events = load_stop_events()
-    df_events = add_time_blocks(df_events)
-    df_events = add_traffic_flag(df_events)
+    df_events = load_prepared_events()
 
     # ── Sidebar filters ───────────────────────────────────────────────────────
     st.sidebar.header("Filter Options")
     routes = sorted(df_events["routeName"].dropna().unique())
     selected_route = st.sidebar.selectbox("Select Route:", routes)
 
-    stops = (
-        df_events.query("routeName == @selected_route")["stopName"].dropna().unique()
+    route_mask = df_events["routeName"].cat.codes.to_numpy() == (
+        df_events["routeName"].cat.categories.get_loc(selected_route)
     )
+    stops = df_events.loc[route_mask, "stopName"].dropna().unique()
     selected_stops = st.sidebar.multiselect("Select Stops:", sorted(stops))
 
     tblocks = sorted(df_events["timeBlock"].dropna().unique())
@@ -189,57 +389,16 @@ elif page == "Stop Wait Patterns":
         st.info("Please select at least one stop to see the charts.")
         st.stop()
 
-    # ── Filter & convert durations ─────────────────────────────────────────
-    filtered_events = df_events.query(
-        "routeName == @selected_route "
-        "and stopName in @selected_stops "
-        "and timeBlock == @selected_time_block"
-    ).copy()
-    filtered_events["stopDurationMinutes"] = filtered_events["stopDurationSeconds"] / 60
-
-    # ── Outlier split ───────────────────────────────────────────────────────
-    thr = filtered_events["stopDurationMinutes"].quantile(0.95)
-    core = filtered_events[filtered_events["stopDurationMinutes"] <= thr].copy()
-    outliers = filtered_events[filtered_events["stopDurationMinutes"] > thr].copy()
-
-    # ── Holdover merge ──────────────────────────────────────────────────────
-    # 1) normalize both sides
-    core["route_key"] = core["routeName"].apply(normalize_route)
-    core["stop_key"] = core["stopName"].apply(normalize_stop)
-    core["stop_key"] = core["stop_key"].replace(
-        {
-            "logan cneter": "logan center for arts",
-            "logan center": "logan center for arts",
-            "drexel garage": "drexel garage",
-        }
+    # ── Filter & aggregate (cached on the selections) ──────────────────────
+    avg_stop, avg_time = stop_wait_aggregates(
+        df_events,
+        selected_route,
+        tuple(selected_stops),
+        selected_time_block,
+        source_mtime(),
     )
 
-    hold = load_holdover_data()
-    hold["route_key"] = hold["route"].apply(normalize_route)
-    hold["stop_key"] = hold["holdover_stop"].apply(normalize_stop)
-
-    # 2) patch special cases twice (typo + proper name)
-    special = {
-        "law": "law school",
-        "goldblatt pavillion": "goldblatt pavilion",
-        "60th and ellis": "60th st. and ellis",
-        "logan cneter": "logan center for arts",
-        "logan center": "logan center for arts",
-    }
-    hold["stop_key"] = hold["stop_key"].replace(special)
-    hold["stop_key"] = hold["stop_key"].replace(special)
-
-    # 3) merge & flag
-    merged = core.merge(hold, how="left", on=["route_key", "stop_key"])
-    merged["isHoldover"] = merged["durationMinutes"].fillna(0) > 0
-
     # ── Chart 1: Avg by Stop ────────────────────────────────────────────────
-    avg_stop = (
-        merged.groupby(["stopName", "isHoldover"])["stopDurationMinutes"]
-        .mean()
-        .reset_index()
-        .sort_values("stopDurationMinutes", ascending=False)
-    )
     chart1 = (
         alt.Chart(avg_stop)
         .mark_bar()
@@ -261,9 +420,6 @@ elif page == "Stop Wait Patterns":
     st.altair_chart(chart1, use_container_width=True)
 
     # ── Chart 2: Avg by Time Block ─────────────────────────────────────────
-    avg_time = (
-        filtered_events.groupby("timeBlock")["stopDurationMinutes"].mean().reset_index()
-    )
     mx = avg_time["stopDurationMinutes"].max()
     y_scale = alt.Scale(domain=[0, mx * 1.1]) if not math.isnan(mx) else alt.Scale()
 
@@ -291,8 +447,7 @@ elif page == "Stop Wait Patterns":
 
 # ──────────────────────────────────────────────────────────────────────────────
 elif page == "Frequency vs. Wait":
-    events_df = load_stop_events()
-    events_df = add_time_blocks(events_df)
+    events_df = load_prepared_events()
 
     # ── Page header ─────────────────────────────────────────────────────
     st.title("🚍 UGo Shuttle: Stop Frequency vs. Wait Time")
@@ -317,16 +472,18 @@ elif page == "Frequency vs. Wait":
 
     # ── Compute per-stop avg daily visits & avg wait ────────────────────
     daily_counts = (
-        core_df.groupby(["stopName", core_df["arrivalTime"].dt.date])
+        core_df.groupby(["stopName", core_df["arrivalTime"].dt.date], observed=True)
         .size()
         .reset_index(name="daily_count")
     )
     stats = (
-        daily_counts.groupby("stopName")["daily_count"]
+        daily_counts.groupby("stopName", observed=True)["daily_count"]
         .mean()
         .reset_index(name="avg_daily_count")
         .merge(
-            core_df.groupby("stopName")["waitMin"].mean().reset_index(name="avg_wait"),
+            core_df.groupby("stopName", observed=True)["waitMin"]
+            .mean()
+            .reset_index(name="avg_wait"),
             on="stopName",
         )
     )
@@ -420,22 +577,17 @@ elif page == "Frequency vs. Wait":
 
 
 elif page == "Bus Stop Variance Explorer":
-    stop_events_df = load_stop_events()
-    stop_events_df = assign_expected_frequencies(stop_events_df)
-
     st.sidebar.header("Filter Options")
-    frequencies = (
-        stop_events_df["expectedFreq"].dropna().astype(int).sort_values().unique()
-    )
+    frequencies = scheduled_frequencies(source_mtime())
     selected_freq = st.sidebar.selectbox(
         "Expected Frequency (min):",
         options=frequencies,
         format_func=lambda x: f"{x} min",
     )
 
-    stop_events_df = stop_events_df[stop_events_df["expectedFreq"] == selected_freq]
-    stop_events_df = stop_events_df[stop_events_df["expectedFreq"].notna()]
-    _, variances, medians = process_arrival_times(stop_events_df)
+    variances, medians = process_arrival_times_for_frequency(
+        int(selected_freq), source_fingerprint()
+    )
 
     routes = variances["routeName"].unique()
     selected_route = st.sidebar.selectbox("Route:", sorted(routes))
@@ -503,35 +655,21 @@ elif page == "Time Series Analysis":
     route_sel = st.selectbox("Select Route", agg["routeName"].unique())
     month_sel = st.selectbox("Select Month", months)
 
-    days = [
-        "Monday",
-        "Tuesday",
-        "Wednesday",
-        "Thursday",
-        "Friday",
-        "Saturday",
-        "Sunday",
-    ]
-    filt = agg[(agg["routeName"] == route_sel) & (agg["month"] == month_sel)].copy()
-    filt["week_day"] = pd.Categorical(filt["week_day"], categories=days, ordered=True)
+    filt = agg[(agg["routeName"] == route_sel) & (agg["month"] == month_sel)]
 
-    pivot = filt.pivot_table(
-        index="week_day", columns="month_week", values="passengerLoad", observed=True
-    ).sort_index()
-    pivot.columns = [f"Week {int(w)}" for w in pivot.columns]
-    long = pivot.reset_index().melt(
-        id_vars="week_day", var_name="week", value_name="passengerLoad"
+    merged = (
+        filt.groupby(["month_week", "week_day", "date"], observed=True, as_index=False)[
+            "passengerLoad"
+        ]
+        .mean()
+        .assign(week=lambda d: "Week " + d["month_week"].astype(int).astype(str))
     )
 
-    dm = filt[["week_day", "month_week", "date"]].drop_duplicates()
-    dm["week"] = "Week " + dm["month_week"].astype(int).astype(str)
-    merged = long.merge(dm, on=["week_day", "week"], how="left")
-
     st.altair_chart(
         alt.Chart(merged)
         .mark_line(point=True)
         .encode(
-            x=alt.X("week_day:N", sort=days, title="Day of Week"),
+            x=alt.X("week_day:N", sort=DAY_NAMES, title="Day of Week"),
             y=alt.Y("passengerLoad:Q", title="Passenger Load"),
             color="week:N",
             tooltip=[
@@ -556,7 +694,7 @@ elif page == "Time Series Analysis":
 
 elif page == "Bunching Exploration":
     # Load the data
-    stop_events_df = load_stop_events()
+    stop_events_df = load_stop_events(columns=["routeName", "stopName", "arrivalTime"])
     stop_events_df = assign_expected_frequencies(stop_events_df)
     st.title("Heaway by Scheduled Frequency")
     st.markdown("""
@@ -566,21 +704,8 @@ elif page == "Bunching Exploration":
 
     """)
     # Compute back-looking headway
-    headways_df = (
-        stop_events_df.assign(date=stop_events_df["arrivalTime"].dt.date)
-        .sort_values(["routeName", "stopName", "date", "arrivalTime"])
-        .assign(
-            prev_arrival=lambda d: d.groupby(["routeName", "stopName", "date"])[
-                "arrivalTime"
-            ].shift(1)
-        )
-        .assign(
-            headway_min=lambda d: (
-                d["arrivalTime"] - d["prev_arrival"]
-            ).dt.total_seconds()
-            / 60
-        )
-        .dropna(subset=["headway_min", "expectedFreq"])
+    headways_df = add_headways(stop_events_df, ["routeName", "stopName"]).dropna(
+        subset=["headway_min", "expectedFreq"]
     )
 
     # Trim outliers using IQR
@@ -634,7 +759,25 @@ elif page == "Bunching Exploration":
     st.altair_chart(box, use_container_width=True)
 
     with st.expander("Show headway table (IQR-trimmed)"):
-        st.dataframe(trimmed_df)
+        TABLE_ROW_LIMIT = 5000
+        headway_table = trimmed_df[
+            ["routeName", "stopName", "arrivalTime", "headway_min", "expectedFreq"]
+        ]
+        st.caption(
+            f"Showing the first {min(len(headway_table), TABLE_ROW_LIMIT):,} "
+            f"of {len(headway_table):,} rows."
+        )
+        st.dataframe(
+            headway_table.head(TABLE_ROW_LIMIT),
+            hide_index=True,
+            use_container_width=True,
+        )
+        st.download_button(
+            "Download full table (CSV)",
+            data=lambda: headway_table.to_csv(index=False),
+            file_name="headways_iqr_trimmed.csv",
+            mime="text/csv",
+        )
 
 elif page == "Connector Bunching Map":
     st.title("Downtown Connector – Stop-level Bunching")
@@ -642,60 +785,15 @@ elif page == "Connector Bunching Map":
     This page investigates the rate of bunching in the downtown connector shuttle route in the user-selected timeframe.
     Calculated based on time between consecutive stop events at each stop for every route.
     - Use the sidebar to select the timeframe which you are interested in.
-    - Click each stop for detailed information.
+    - Hover over each stop for detailed information.
         - The color of the stop represents the bunching rate
-        - The name and bunching rate at the stop is displayed when clicked.
+        - The name and bunching rate at the stop is displayed on hover.
     - Click 'Show underlying numbers' to see the data in table format.
 
     """)
 
-    # ── Google Maps API key ──────────────────────────────────────────────
-    api_key = os.environ["GOOGLE_MAP_KEY"]  # make sure this is loaded
-
-    # ── Stop coordinates ────────────────────────────────────────────────
-    STOP_COORDS = {
-        "Gleacher Center": (41.88964, -87.62196),
-        "Rockefeller Chapel": (41.78779, -87.59664),
-        "E Randolph St & S Michigan Ave": (41.88430, -87.62383),
-        "S Michigan Ave/Roosevelt": (41.86795, -87.62397),
-        "S (Upper) Wacker Dr & W Adams St": (41.87950, -87.63701),
-        "S Lake Park Ave & E Hyde Park Blvd": (41.80279, -87.58782),
-        "N (Upper) Wacker Dr & W Madison St": (41.88205, -87.63712),
-        "S Lake Park & E 53rd St": (41.79952, -87.58716),
-        "55th Street & University": (41.79497, -87.59787),
-        "UCHICAGO Medicine - River East": (41.89192, -87.61817),
-        "Goldblatt Pavilion": (41.78778, -87.60380),
-        "UCHICAGO Medicine - South Loop": (41.86968, -87.63950),
-        "Roosevelt Station": (41.86729, -87.62686),
-    }
-    coord_df = (
-        pd.DataFrame.from_dict(STOP_COORDS, orient="index", columns=["lat", "lon"])
-        .reset_index()
-        .rename(columns={"index": "stopName"})
-    )
-
-    # ── Load + preprocess ALL events once (no hour filter yet) ─────────
+    # ── Hour-range slider → cached per-stop bunching for the map ──────
     ROUTE_KEY = "Downtown Campus Connector"
-    base_df = assign_expected_frequencies(load_stop_events())
-    base_df = base_df[base_df["routeName"].str.contains(ROUTE_KEY, na=False)]
-    base_df = (
-        base_df.assign(date=base_df["arrivalTime"].dt.date)
-        .sort_values(["stopName", "date", "arrivalTime"])
-        .assign(
-            prev_arrival=lambda d: d.groupby(["stopName", "date"])["arrivalTime"].shift(
-                1
-            )
-        )
-        .assign(
-            headway_min=lambda d: (
-                d["arrivalTime"] - d["prev_arrival"]
-            ).dt.total_seconds()
-            / 60
-        )
-        .dropna(subset=["headway_min", "expectedFreq"])
-    )
-
-    # ── Hour-range slider → subset for the map ─────────────────────────
     hr_start, hr_end = st.slider(
         "Select hour range",
         0,
@@ -705,112 +803,33 @@ elif page == "Connector Bunching Map":
         format="%0dh",
         help="Arrivals whose *hour* falls in this range are counted.",
     )
-    sub_df = base_df[base_df["arrivalTime"].dt.hour.between(hr_start, hr_end)]
-    bunch_sub = (
-        sub_df.assign(is_bunched=sub_df["headway_min"] < 0.5 * sub_df["expectedFreq"])
-        .groupby("stopName")["is_bunched"]
-        .mean()
-        .reset_index(name="bunching_rate")
-    )
+    plot_df = connector_bunching(hr_start, hr_end, ROUTE_KEY, source_mtime())
 
-    # ── Merge coords & JSON serialise ─────────────────────────────────
-    plot_df = (
-        bunch_sub.merge(coord_df, on="stopName", how="left")
-        .dropna(subset=["lat", "lon"])
-        .assign(pct=lambda d: (d["bunching_rate"] * 100).round(1))
+    # ── Draw the stops as a WebGL scatter layer ───────────────────────
+    center_lat, center_lon = 41.828233054114776, -87.61244384080472
+    stop_layer = pdk.Layer(
+        "ScatterplotLayer",
+        id="bunching-stops",
+        data=plot_df[["stopName", "lat", "lon", "pct", "color"]],
+        get_position=["lon", "lat"],
+        get_radius=120,
+        get_fill_color="color",
+        get_line_color=[255, 7, 58],
+        line_width_min_pixels=2,
+        stroked=True,
+        pickable=True,
+    )
+    st.pydeck_chart(
+        pdk.Deck(
+            layers=[stop_layer],
+            initial_view_state=pdk.ViewState(
+                latitude=center_lat, longitude=center_lon, zoom=11
+            ),
+            tooltip={"html": "<b>{stopName}</b><br>Bunching: {pct} %"},
+        )
     )
-    points_json = json.dumps(
-        plot_df[["stopName", "lat", "lon", "pct"]].to_dict("records")
-    )
-
-    # ── Build the embedded HTML/JS page ───────────────────────────────
-    color_js = """
-      // -------- Viridis palette (light ➟ dark, 7 steps) ---------------
-      const VIRIDIS = ['#FDE725','#B4DE2C','#6DCD59',
-                       '#35B779','#1F9E89','#31688E','#440154'];
-
-      // -------- Fixed boundaries (0,10,20,…,70) -----------------------
-      const BREAKS = [0,10,20,30,40,50,60,70];
-
-      // -------- Map a value → colour, using fixed buckets -------------
-      function pctToColor(val){
-        for(let i=0;i < BREAKS.length-1; i++){
-          if(val < BREAKS[i+1]) return VIRIDIS[i];
-        }
-        return VIRIDIS[VIRIDIS.length-1];            // ≥ 70 %
-      }
-
-      // -------- Produce legend rows -----------------------------------
-      function buildLegendRows(){
-        const rows = [];
-        for(let i=0; i<VIRIDIS.length; i++){
-          const lower = BREAKS[i];
-          const upper = (i < BREAKS.length-2) ? BREAKS[i+1] : null;
-          const label = upper ? `${lower}&ndash;${upper}` : `≥ ${lower}`;
-          rows.push({col: VIRIDIS[i], lab: label});
-        }
-        return rows;
-      }
-    """
 
-    center_lat, center_lon = 41.828233054114776, -87.61244384080472
-    html = f"""
-<!DOCTYPE html><html><head>
-  <style>
-    html,body,#map{{height:100%;margin:0}}
-    .legend-box{{background:#fff;padding:8px;border:1px solid #888;border-radius:4px;
-                 font:12px/14px Arial;margin:8px}}
-  </style>
-  <script src="https://maps.googleapis.com/maps/api/js?key={api_key}"></script>
-</head><body>
-<div id="map"></div>
-<script>
-  const pts = {points_json};
-  {color_js}
-
-  // ---------- Create map ---------------------------------------------
-  const map = new google.maps.Map(document.getElementById('map'), {{
-    center: {{lat:{center_lat}, lng:{center_lon}}},
-    zoom: 11,
-    mapTypeControl:false, streetViewControl:false, fullscreenControl:false
-  }});
-
-  // ---------- Draw circles -------------------------------------------
-  pts.forEach(p => {{
-    const fillCol = pctToColor(p.pct);
-    const circle = new google.maps.Circle({{
-      strokeColor: '#FF073A',
-      strokeOpacity: 1,
-      strokeWeight: 2,
-      fillColor: fillCol,
-      fillOpacity: 0.8,
-      map,
-      center: {{lat:p.lat, lng:p.lon}},
-      radius: 120
-    }});
-
-    const infow = new google.maps.InfoWindow();
-    circle.addListener('click', () => {{
-      infow.setContent(`<b>${{p.stopName}}</b><br>Bunching: ${{p.pct}} %`);
-      infow.setPosition({{lat:p.lat, lng:p.lon}});
-      infow.open({{map}});
-    }});
-  }});
-
-  // ---------- Build fixed-bucket legend ------------------------------
-  const legend = document.createElement('div');
-  legend.className = 'legend-box';
-  legend.innerHTML = '<b>Bunching&nbsp;(%)</b><br>';
-  buildLegendRows().forEach(r => {{
-    legend.innerHTML +=
-      `<span style="display:inline-block;width:18px;height:10px;` +
-      `background:${{r.col}};margin-right:4px"></span>${{r.lab}}<br>`;
-  }});
-  map.controls[google.maps.ControlPosition.RIGHT_BOTTOM].push(legend);
-</script>
-</body></html>
-"""
-    components.html(html, height=520, scrolling=False)
+    st.markdown(BUNCHING_LEGEND_HTML, unsafe_allow_html=True)
 
     st.markdown(
         f"**Bunching definition:** headway < 50 % of scheduled frequency • "
@@ -820,7 +839,8 @@ elif page == "Connector Bunching Map":
         st.dataframe(
             plot_df[["stopName", "pct"]]
             .rename(columns={"pct": "bunching rate (%)"})
-            .sort_values("bunching rate (%)", ascending=False)
+            .sort_values("bunching rate (%)", ascending=False),
+            hide_index=True,
         )
 
 elif page == "NightRide Explorer":
@@ -837,11 +857,25 @@ elif page == "NightRide Explorer":
         default=default_routes,
     )
 
-    filtered = data[data["routeName"].isin(routes)].copy()
+    # 2. Pre-aggregate the selected routes once by hour, route and stop;
+    #    every chart below is derived from this small frame
+    stop_hours = (
+        data.loc[
+            data["routeName"].isin(routes),
+            ["hour", "routeName", "stopName", "passengerLoad"],
+        ]
+        .groupby(
+            ["hour", "routeName", "stopName"],
+            as_index=False,
+            dropna=False,
+            observed=True,
+        )
+        .agg(maxLoad=("passengerLoad", "max"), totalLoad=("passengerLoad", "sum"))
+    )
 
-    # 2. Aggregate max passenger load by hour and route
-    agg = filtered.groupby(["hour", "routeName"], as_index=False).agg(
-        {"passengerLoad": "max"}
+    # Max passenger load by hour and route
+    agg = stop_hours.groupby(["hour", "routeName"], as_index=False, observed=True).agg(
+        passengerLoad=("maxLoad", "max")
     )
 
     # 3. Create Altair line plot
@@ -898,10 +932,10 @@ elif page == "NightRide Explorer":
 
     # 6. Aggregate passenger load by stop
     top_stops = (
-        filtered.groupby("stopName", as_index=False)
-        .agg({"passengerLoad": "sum"})
-        .sort_values("passengerLoad", ascending=False)
-        .head(10)  # Top 10 stops
+        stop_hours.groupby("stopName", observed=True)["totalLoad"]
+        .sum()
+        .nlargest(10)  # Top 10 stops
+        .reset_index(name="passengerLoad")
     )
 
     bar_chart = (
@@ -919,14 +953,14 @@ elif page == "NightRide Explorer":
 
     # 6. Filter data for late-night hours only (23:00 and later)
     LATE_NIGHT_START_HOUR = 23
-    late_night = filtered[filtered["hour"] >= LATE_NIGHT_START_HOUR]
+    late_night = stop_hours[stop_hours["hour"] >= LATE_NIGHT_START_HOUR]
 
     # 7. Aggregate passenger load by stop
     top_late_stops = (
-        late_night.groupby("stopName", as_index=False)
-        .agg({"passengerLoad": "sum"})
-        .sort_values("passengerLoad", ascending=False)
-        .head(10)  # Show top 10 stops
+        late_night.groupby("stopName", observed=True)["totalLoad"]
+        .sum()
+        .nlargest(10)  # Show top 10 stops
+        .reset_index(name="passengerLoad")
     )
 
     # 8. Create bar chart
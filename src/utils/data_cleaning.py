@@ -2,21 +2,88 @@
 
 import zipfile
 from pathlib import Path
+from urllib.request import urlopen
 
-import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+# numeric columns stored as float32; a column holding stray text is kept
+# as read and coerced by the loaders instead of failing the download
+FLOAT32_COLUMNS = ("stopDurationSeconds",)
+NAME_COLUMNS = ("routeName", "stopName")
+# empty fields are missing values, as they were with pandas.read_csv
+CONVERT_OPTIONS = pacsv.ConvertOptions(strings_can_be_null=True)
 
 
 def read_csv_files(pattern):
-    """Read all CSV files matching a given pattern in the input folder.
+    """Stream a CSV from a URL straight into an Arrow table.
 
     Parameters:
-        pattern (str): The glob pattern to match files.
+        pattern (str): The URL of the CSV file.
     """
-    df_shuttles = pd.read_csv(pattern)
-    print(f"Loaded {df_shuttles.shape[0]} rows of data")
-    if df_shuttles.shape[0] == 0:
+    with urlopen(pattern) as response:  # noqa: S310 - fixed Box URLs
+        table = pacsv.read_csv(response, convert_options=CONVERT_OPTIONS)
+    print(f"Loaded {table.num_rows} rows of data")
+    if table.num_rows == 0:
         raise Exception(f"No rows loaded from {pattern}")
-    return df_shuttles
+    return table
+
+
+def sorted_dictionary(column):
+    """Dictionary-encode a string column with its values in sorted order.
+
+    Sorted dictionaries load as pandas categoricals whose category order
+    matches plain string sorting.
+
+    Parameters:
+        column (pa.ChunkedArray): String column to encode.
+    """
+    column = column.combine_chunks()
+    values = pc.unique(column).drop_null()
+    values = values.take(pc.sort_indices(values))
+    return pa.DictionaryArray.from_arrays(pc.index_in(column, value_set=values), values)
+
+
+def write_parquet(table, output_path):
+    """Write a table to zstd-compressed Parquet with dictionary-encoded names.
+
+    Parameters:
+        table (pa.Table): The table to persist.
+        output_path (Path): Destination ``.parquet`` file.
+    """
+    for name in FLOAT32_COLUMNS:
+        if name in table.column_names and (
+            pa.types.is_floating(table[name].type)
+            or pa.types.is_integer(table[name].type)
+        ):
+            table = table.set_column(
+                table.column_names.index(name),
+                name,
+                table[name].cast(pa.float32(), safe=False),
+            )
+    for name in NAME_COLUMNS:
+        if name in table.column_names:
+            table = table.set_column(
+                table.column_names.index(name), name, sorted_dictionary(table[name])
+            )
+    pq.write_table(table, output_path, compression="zstd")
+
+
+def convert_tsv_file(tsv_path, output_path):
+    """Convert a TSV written by earlier versions of this script to Parquet.
+
+    Parameters:
+        tsv_path (Path): Tab-separated source file.
+        output_path (Path): Destination ``.parquet`` file.
+    """
+    table = pacsv.read_csv(
+        tsv_path,
+        parse_options=pacsv.ParseOptions(delimiter="\t"),
+        convert_options=CONVERT_OPTIONS,
+    )
+    write_parquet(table, output_path)
 
 
 def load_data():
@@ -52,10 +119,10 @@ def load_data():
         pattern = "ClinicDump-25-23-24-NumShuttlesRunning.csv"
         url = "https://uchicago.box.com/shared/static/qyu4niqtd4lnsixgix4twsvsko1t9hfd.csv"
         NumShuttleRunning = read_csv_files(url)
-        NumShuttleRunning.to_csv(
-            output_dir / "25-23-24-NumShuttleRunning.tsv", sep="\t", index=False
+        write_parquet(
+            NumShuttleRunning, output_dir / "25-23-24-NumShuttleRunning.parquet"
         )
-        print(f"TSV files for {pattern} are created")
+        print(f"Parquet file for {pattern} is created")
     except Exception as e:
         print(f"Error reading NumShuttlesRunning file: {e}")
 
@@ -64,8 +131,8 @@ def load_data():
         pattern = "ClinicDump-25-23-24-StopEvents.csv"
         url = "https://uchicago.box.com/shared/static/2xhk7qazepe3xpmsenpzwoeuc4qwk48q.csv"
         StopEvents = read_csv_files(url)
-        StopEvents.to_csv(output_dir / "25-23-24-StopEvents.tsv", sep="\t", index=False)
-        print(f"TSV files for {pattern} are created")
+        write_parquet(StopEvents, output_dir / "25-23-24-StopEvents.parquet")
+        print(f"Parquet file for {pattern} is created")
     except Exception as e:
         print(f"Error reading StopEvents file: {e}")
 
@@ -74,10 +141,8 @@ def load_data():
         pattern = "ClinicDump-NumShuttlesRunning.csv"
         url = "https://uchicago.box.com/shared/static/178lhqvdkzyempiot2cvd9gep70n5upr.csv"
         NumShuttleRunning = read_csv_files(url)
-        NumShuttleRunning.to_csv(
-            output_dir / "NumShuttleRunning.tsv", sep="\t", index=False
-        )
-        print(f"TSV files for {pattern} are created")
+        write_parquet(NumShuttleRunning, output_dir / "NumShuttleRunning.parquet")
+        print(f"Parquet file for {pattern} is created")
     except Exception as e:
         print(f"Error reading NumShuttlesRunning file: {e}")
 
@@ -86,8 +151,8 @@ def load_data():
         pattern = "ClinicDump-StopEvents.csv"
         url = "https://uchicago.box.com/shared/static/ycdc81r3eqkskz3tykjdj2rdbnvpoc6m.csv"
         StopEvents = read_csv_files(url)
-        StopEvents.to_csv(output_dir / "StopEvents.tsv", sep="\t", index=False)
-        print(f"TSV files for {pattern} are created")
+        write_parquet(StopEvents, output_dir / "StopEvents.parquet")
+        print(f"Parquet file for {pattern} is created")
     except Exception as e:
         print(f"Error reading StopEvents file: {e}")
 
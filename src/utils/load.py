@@ -1,60 +1,175 @@
 """Shared data loading functionality for UGo Transportation Streamlit apps."""
 
+import hashlib
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
+import streamlit as st
+
+from src.utils.data_cleaning import convert_tsv_file
+
+STOP_EVENTS_PATH = Path("data/processed/StopEvents.parquet")
+MARCH_STOP_EVENTS_PATH = Path("data/processed/25-23-24-StopEvents.parquet")
+# repeated labels held as categoricals so groupbys and joins work on codes
+CATEGORY_COLUMNS = ("routeName", "stopName", "direction")
+# columns read when a caller does not name its own
+EVENT_COLUMNS = (
+    "routeName",
+    "stopName",
+    "arrivalTime",
+    "departureTime",
+    "stopDurationSeconds",
+    "passengerLoad",
+)
+# changes with any edit to this module, so disk-persisted results computed
+# by older analysis code are never reused
+CACHE_VERSION = hashlib.blake2b(Path(__file__).read_bytes()).hexdigest()
+
+
+def source_mtime(file_path=STOP_EVENTS_PATH):
+    """Return the modification time of a processed data file.
+
+    Used as a cache key so cached results are rebuilt when the data changes.
+    A newer TSV beside the file is converted first, so the key always
+    describes the Parquet file that will actually be read.
 
+    Args:
+        file_path (Path): Processed data file
 
-def load_stop_events():
-    """Load and prepare stop events data for analysis.
+    Returns:
+        int: Modification time in nanoseconds
+    """
+    _refresh_from_tsv(file_path)
+    return file_path.stat().st_mtime_ns
+
+
+def source_fingerprint(file_path=STOP_EVENTS_PATH):
+    """Return a cache key for a processed Parquet file and this module's code.
+
+    Used for caches kept on disk, which must survive the files being
+    rewritten with identical data on each app start.
+
+    Args:
+        file_path (Path): Processed ``.parquet`` file
 
     Returns:
-        pd.DataFrame: Processed stop events data with proper data types.
+        str: Hex digest of the file contents and ``CACHE_VERSION``
     """
-    file_path = Path("data/processed/StopEvents.tsv")
+    _refresh_from_tsv(file_path)
+    stat = file_path.stat()
+    return _file_digest(file_path, stat.st_mtime_ns, stat.st_size)
+
+
+@st.cache_data(show_spinner=False)
+def _file_digest(file_path, mtime, size):
+    """Hash a file's bytes, cached in memory until it is rewritten."""
+    digest = hashlib.blake2b(CACHE_VERSION.encode())
+    with file_path.open("rb") as data_file:
+        while chunk := data_file.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _refresh_from_tsv(file_path):
+    """Rebuild a processed Parquet file from a newer TSV beside it, if any.
+
+    Data directories prepared before the switch to Parquet only hold TSVs;
+    they are converted once and every later load reads the Parquet file.
+
+    Args:
+        file_path (Path): Processed ``.parquet`` file
+    """
+    tsv_path = file_path.with_suffix(".tsv")
+    if tsv_path.exists() and (
+        not file_path.exists()
+        or tsv_path.stat().st_mtime_ns > file_path.stat().st_mtime_ns
+    ):
+        convert_tsv_file(tsv_path, file_path)
+
+
+def _to_local_time(timestamps):
+    """Convert UTC timestamps to naive Chicago wall-clock time.
+
+    Columns stored as Arrow timestamps skip parsing entirely; ISO-8601
+    strings take pandas' vectorized parser instead of per-element inference.
+    """
+    if not pd.api.types.is_datetime64_any_dtype(timestamps):
+        timestamps = pd.to_datetime(timestamps, utc=True, format="ISO8601", cache=True)
+    elif timestamps.dt.tz is None:
+        timestamps = timestamps.dt.tz_localize("UTC")
+    return timestamps.dt.tz_convert("America/Chicago").dt.tz_localize(None)
+
+
+def _to_float32(values):
+    """Return a numeric column as float32, coercing text only when needed.
+
+    Files written by ``data_cleaning`` already store float32, which is
+    returned as is without another conversion pass.
+    """
+    if values.dtype == np.float32:
+        return values
+    if not pd.api.types.is_numeric_dtype(values):
+        values = pd.to_numeric(values, errors="coerce")
+    return values.astype("float32")
+
+
+def _load_events(file_path, columns):
+    """Load a processed stop events file, converting an older TSV first."""
+    _refresh_from_tsv(file_path)
     if not file_path.exists():
         raise FileNotFoundError(f"Missing file: {file_path.resolve()}")
-    stop_events_df = pd.read_csv(file_path, sep="\t")
-    stop_events_df["arrivalTime"] = (
-        pd.to_datetime(stop_events_df["arrivalTime"], utc=True)
-        .dt.tz_convert("America/Chicago")
-        .dt.tz_localize(None)
-    )
-    stop_events_df["departureTime"] = (
-        pd.to_datetime(stop_events_df["departureTime"], utc=True)
-        .dt.tz_convert("America/Chicago")
-        .dt.tz_localize(None)
+    if columns is None:
+        columns = list(EVENT_COLUMNS)
+    return _read_events(file_path, columns, source_mtime(file_path))
+
+
+@st.cache_data(show_spinner=False)
+def _read_events(file_path, columns, data_version):
+    """Read and type a stop events file, cached on path, columns and version."""
+    stop_events_df = pd.read_parquet(file_path, columns=columns)
+    for time_col in ("arrivalTime", "departureTime"):
+        if time_col in stop_events_df:
+            stop_events_df[time_col] = _to_local_time(stop_events_df[time_col])
+    if "stopDurationSeconds" in stop_events_df:
+        stop_events_df["stopDurationSeconds"] = _to_float32(
+            stop_events_df["stopDurationSeconds"]
+        )
+    # loads are small counts; columns with gaps keep their float dtype
+    if "passengerLoad" in stop_events_df and pd.api.types.is_integer_dtype(
+        stop_events_df["passengerLoad"]
+    ):
+        stop_events_df["passengerLoad"] = stop_events_df["passengerLoad"].astype(
+            "int16"
+        )
+    return stop_events_df.astype(
+        {col: "category" for col in CATEGORY_COLUMNS if col in stop_events_df}
     )
-    stop_events_df["stopDurationSeconds"] = pd.to_numeric(
-        stop_events_df["stopDurationSeconds"], errors="coerce"
-    )
-    return stop_events_df
 
 
-def load_stop_events_march():
+def load_stop_events(columns=None):
+    """Load and prepare stop events data for analysis.
+
+    Args:
+        columns (list, optional): Columns to read. Reads ``EVENT_COLUMNS`` if None.
+
+    Returns:
+        pd.DataFrame: Processed stop events data with proper data types.
+    """
+    return _load_events(STOP_EVENTS_PATH, columns)
+
+
+def load_stop_events_march(columns=None):
     """Load and prepare 25-23-24 stop events data for analysis.
 
+    Args:
+        columns (list, optional): Columns to read. Reads ``EVENT_COLUMNS`` if None.
+
     Returns:
         pd.DataFrame: Processed stop events data with proper data types.
     """
-    file_path = Path("data/processed/25-23-24-StopEvents.tsv")
-    if not file_path.exists():
-        raise FileNotFoundError(f"Missing file: {file_path.resolve()}")
-    stop_events_df = pd.read_csv(file_path, sep="\t")
-    stop_events_df["arrivalTime"] = (
-        pd.to_datetime(stop_events_df["arrivalTime"], utc=True)
-        .dt.tz_convert("America/Chicago")
-        .dt.tz_localize(None)
-    )
-    stop_events_df["departureTime"] = (
-        pd.to_datetime(stop_events_df["departureTime"], utc=True)
-        .dt.tz_convert("America/Chicago")
-        .dt.tz_localize(None)
-    )
-    stop_events_df["stopDurationSeconds"] = pd.to_numeric(
-        stop_events_df["stopDurationSeconds"], errors="coerce"
-    )
-    return stop_events_df
+    return _load_events(MARCH_STOP_EVENTS_PATH, columns)
 
 
 def process_arrival_times(stop_events_df):
@@ -67,127 +182,275 @@ def process_arrival_times(stop_events_df):
         tuple: (filtered_df, variances_df, medians_df) - Filtered dataframe and summary stats
     """
     stop_events_df = stop_events_df[stop_events_df["expectedFreq"].notna()]
-    stop_events_df["serviceDate"] = stop_events_df["arrivalTime"].dt.date
-    df_sorted = stop_events_df.sort_values(
-        by=["routeName", "stopName", "serviceDate", "arrivalTime"]
+    # gaps between consecutive arrivals at each stop within a service day; the
+    # day boundary comes from the int64 timestamps, so no per-row date objects
+    df_sorted = add_headways(stop_events_df, ["routeName", "stopName"]).rename(
+        columns={"headway_min": "arrival_diff"}
     )
-    df_sorted["arrival_diff"] = (
-        df_sorted.groupby(["routeName", "stopName", "serviceDate"])["arrivalTime"]
-        .diff()
-        .dt.total_seconds()
-    ) / 60
+    df_sorted["arrival_diff"] = df_sorted["arrival_diff"].astype("float32")
     df_valid = df_sorted.dropna(subset=["arrival_diff"])
 
     # Filter outliers
-    lower = df_valid["arrival_diff"].quantile(0.1)
-    upper = df_valid["arrival_diff"].quantile(0.9)
-
-    df_valid = df_valid.copy()
-    df_valid["isOutlier"] = df_valid["arrival_diff"].apply(
-        lambda x: x < lower or x > upper if pd.notna(x) else False
+    arrival_diff = df_valid["arrival_diff"].to_numpy()
+    if arrival_diff.size == 0:
+        # no stop saw two arrivals in a day; summarize the empty frame
+        df_filtered = df_valid
+    else:
+        lower, upper = np.quantile(arrival_diff, [0.1, 0.9])
+        # arrival_diff has no NaNs here, so a plain range check is enough
+        df_filtered = df_valid[(arrival_diff >= lower) & (arrival_diff <= upper)]
+
+    # Standard deviations and medians in a single grouped pass; the frame is
+    # already sorted on the keys, so first-seen order matches sorted order
+    stats = (
+        df_filtered.groupby(["routeName", "stopName"], observed=True, sort=False)
+        .agg(
+            arrival_stdev=("arrival_diff", "std"),
+            arrival_median=("arrival_diff", "median"),
+        )
+        .reset_index()
     )
+    variances = stats.drop(columns="arrival_median")
+    medians = stats.drop(columns="arrival_stdev")
 
-    df_filtered = df_valid[~df_valid["isOutlier"]]
+    return df_filtered, variances, medians
 
-    # Calculate standard deviations
-    variances = (
-        df_filtered.groupby(["routeName", "stopName"])["arrival_diff"]
-        .std()
-        .reset_index()
-    )
-    variances = variances.rename(columns={"arrival_diff": "arrival_stdev"})
 
-    # Calculate medians
-    medians = (
-        df_filtered.groupby(["routeName", "stopName"])["arrival_diff"]
-        .median()
-        .reset_index()
+@st.cache_data(show_spinner=False, persist="disk")
+def process_arrival_times_for_frequency(freq, data_version):
+    """Process arrival times for the stop events scheduled at one frequency.
+
+    Cached on the frequency and data version, so switching between metrics
+    for the same frequency does not recompute the statistics. Only the
+    per-stop summaries are cached, so a cache hit copies a few hundred rows
+    rather than the whole filtered event frame. The cache is kept on disk.
+
+    Args:
+        freq (int): Expected frequency in minutes
+        data_version (str): ``source_fingerprint()`` of the stop events file
+
+    Returns:
+        tuple: (variances_df, medians_df) for that frequency
+    """
+    stop_events_df = assign_expected_frequencies(
+        load_stop_events(columns=["routeName", "stopName", "arrivalTime"])
+    )
+    _, variances, medians = process_arrival_times(
+        stop_events_df[stop_events_df["expectedFreq"] == freq]
     )
-    medians = medians.rename(columns={"arrival_diff": "arrival_median"})
+    return variances, medians
 
-    return df_filtered, variances, medians
 
+def add_headways(stop_events_df, group_cols):
+    """Add the minutes since the previous arrival within each group and day.
 
-def assign_expected_frequencies(stop_events_df):
-    """Add expected frequency flags to stop events based on route and time."""
-    stop_events_df["arrivalHour"] = stop_events_df["arrivalTime"].dt.hour
-    stop_events_df["arrivalWeekday"] = stop_events_df[
-        "arrivalTime"
-    ].dt.dayofweek  # Monday=0, Sunday=6
-
-    # schedule from UGo site
-    schedule_map = {
-        "Red Line/Arts Block": [
-            ([0, 1, 2, 3, 4], 6.5, 21, 10)
-        ],  # example: M-F 6:30am - 9:00pm
-        "Friend Center/Metra": [([0, 1, 2, 3, 4], 5, 21, 30)],
-        "Drexel": [([0, 1, 2, 3, 4], 5, 10, 10)],
-        "Apostolic": [([0, 1, 2, 3, 4], 5, 10, 10)],
-        "Apostolic/Drexel": [
-            ([0, 1, 2, 3, 4], 10, 15, 15),
-            ([0, 1, 2, 3, 4], 15, 24.5, 10),
-        ],
-        "Midway Metra": [
-            ([0, 1, 2, 3, 4], 5.66, 9.66, 15),
-            ([0, 1, 2, 3, 4], 15.5, 18.66, 15),
-        ],
-        "53rd Street Express": [
-            ([0, 1, 2, 3, 4], 7, 8, 30),
-            ([0, 1, 2, 3, 4], 8, 10.5, 15),
-            ([0, 1, 2, 3, 4], 10.5, 18, 30),
-        ],
-        "Downtown Campus Connector": [
-            ([0, 1, 2, 3, 4], 6.5, 22, 20),
-        ],
-        "Regents Express": [([0, 1, 2, 3, 4], 5.33, 21, 30)],
-        "North": [
-            ([0, 1, 2, 3, 4, 5, 6], 16, 23, 15),
-            ([0, 1, 2, 3, 4, 5, 6], 23, 28, 30),
-        ],
-        "East": [
-            ([0, 1, 2, 3, 4, 5, 6], 16, 23, 15),
-            ([0, 1, 2, 3, 4, 5, 6], 23, 28, 30),
-        ],
-        "Central": [
-            ([0, 1, 2, 3, 4, 5, 6], 16, 23, 15),
-            ([0, 1, 2, 3, 4, 5, 6], 23, 28, 30),
-        ],
-        "South": [
-            ([0, 1, 2, 3, 4, 5, 6], 16, 23, 15),
-            ([0, 1, 2, 3, 4, 5, 6], 23, 28, 30),
-        ],
-        "South Loop Shuttle": [([4, 5], 18, 24.5, 60)],
-    }
+    Rows are sorted by the group columns and arrival time, then consecutive
+    arrival times are differenced in a single vectorized pass. The first
+    arrival of a group on each service day gets a missing headway.
 
-    def get_expected_freq(row):
-        route = row["routeName"].strip()
-        hour = row["arrivalHour"] + row["arrivalTime"].minute / 60
-        weekday = row["arrivalWeekday"]
+    Args:
+        stop_events_df (pd.DataFrame): Stop events data with 'arrivalTime'
+        group_cols (list): Columns identifying a group, e.g. route and stop
 
-        EARLY_MORNING_CUTOFF_HOUR = 4
+    Returns:
+        pd.DataFrame: Sorted dataframe with an added 'headway_min' column
+    """
+    arrival_times = stop_events_df["arrivalTime"].to_numpy("datetime64[ns]")
+    arrival_ns = arrival_times.view("i8")
+    missing = np.isnat(arrival_times)
+
+    # sort once on integer keys; missing keys and times go last, as in sort_values
+    sort_keys = [np.where(missing, np.iinfo(np.int64).max, arrival_ns)]
+    key_codes = []
+    for col in reversed(group_cols):
+        codes, uniques = pd.factorize(stop_events_df[col], sort=True)
+        missing |= codes < 0
+        codes = np.where(codes < 0, len(uniques), codes)
+        sort_keys.append(codes)
+        key_codes.append(codes)
+    order = np.lexsort(sort_keys)
+    headways_df = stop_events_df.iloc[order]
+    arrival_ns = arrival_ns[order]
+    missing = missing[order]
+
+    # a row starts a new group when any key or the service day changes
+    new_group = np.ones(len(headways_df), dtype=bool)
+    day = arrival_ns // pd.Timedelta(days=1).value
+    new_group[1:] = (day[1:] != day[:-1]) | missing[:-1]
+    for codes in key_codes:
+        codes = codes[order]
+        new_group[1:] |= codes[1:] != codes[:-1]
+
+    headway = np.diff(arrival_ns, prepend=arrival_ns[:1]).astype("float64")
+    headway[new_group | missing] = np.nan
+    return headways_df.assign(headway_min=headway / pd.Timedelta(minutes=1).value)
+
+
+# schedule from UGo site: route -> [(weekdays, start hour, end hour, frequency)]
+SCHEDULE_MAP = {
+    "Red Line/Arts Block": [
+        ([0, 1, 2, 3, 4], 6.5, 21, 10)
+    ],  # example: M-F 6:30am - 9:00pm
+    "Friend Center/Metra": [([0, 1, 2, 3, 4], 5, 21, 30)],
+    "Drexel": [([0, 1, 2, 3, 4], 5, 10, 10)],
+    "Apostolic": [([0, 1, 2, 3, 4], 5, 10, 10)],
+    "Apostolic/Drexel": [
+        ([0, 1, 2, 3, 4], 10, 15, 15),
+        ([0, 1, 2, 3, 4], 15, 24.5, 10),
+    ],
+    "Midway Metra": [
+        ([0, 1, 2, 3, 4], 5.66, 9.66, 15),
+        ([0, 1, 2, 3, 4], 15.5, 18.66, 15),
+    ],
+    "53rd Street Express": [
+        ([0, 1, 2, 3, 4], 7, 8, 30),
+        ([0, 1, 2, 3, 4], 8, 10.5, 15),
+        ([0, 1, 2, 3, 4], 10.5, 18, 30),
+    ],
+    "Downtown Campus Connector": [
+        ([0, 1, 2, 3, 4], 6.5, 22, 20),
+    ],
+    "Regents Express": [([0, 1, 2, 3, 4], 5.33, 21, 30)],
+    "North": [
+        ([0, 1, 2, 3, 4, 5, 6], 16, 23, 15),
+        ([0, 1, 2, 3, 4, 5, 6], 23, 28, 30),
+    ],
+    "East": [
+        ([0, 1, 2, 3, 4, 5, 6], 16, 23, 15),
+        ([0, 1, 2, 3, 4, 5, 6], 23, 28, 30),
+    ],
+    "Central": [
+        ([0, 1, 2, 3, 4, 5, 6], 16, 23, 15),
+        ([0, 1, 2, 3, 4, 5, 6], 23, 28, 30),
+    ],
+    "South": [
+        ([0, 1, 2, 3, 4, 5, 6], 16, 23, 15),
+        ([0, 1, 2, 3, 4, 5, 6], 23, 28, 30),
+    ],
+    "South Loop Shuttle": [([4, 5], 18, 24.5, 60)],
+}
+
+# arrivals before this hour belong to the previous service day
+EARLY_MORNING_CUTOFF_HOUR = 4
+MINUTES_PER_DAY = 24 * 60
+
+
+def _build_schedule_lut():
+    """Tabulate expected frequency by route, weekday and minute of service day.
+
+    Minutes run past midnight (up to 48h) so late-night windows such as
+    23:00-28:00 are plain ranges. Each minute's hour is computed with the
+    same float arithmetic as before, so window edges match exactly.
+    """
+    minute = np.arange(2 * MINUTES_PER_DAY)
+    clock = minute % MINUTES_PER_DAY
+    hour = clock // 60 + (clock % 60) / 60
+    hour = np.where(minute >= MINUTES_PER_DAY, hour + 24, hour)
+
+    lut = np.full((len(SCHEDULE_MAP), 7, len(minute)), np.nan, dtype="float32")
+    for route_idx, schedules in enumerate(SCHEDULE_MAP.values()):
+        # fill in reverse so the first matching window wins
+        for valid_days, start, end, freq in reversed(schedules):
+            in_window = (start <= hour) & (hour < end)
+            for weekday in valid_days:
+                lut[route_idx, weekday, in_window] = freq
+    return lut
 
-        if 0 <= hour < EARLY_MORNING_CUTOFF_HOUR:
-            hour += 24
 
-        schedules = schedule_map.get(route, [])
-        for valid_days, start, end, freq in schedules:
-            if weekday in valid_days and start <= hour < end:
-                return freq
-        return pd.NA
+SCHEDULE_LUT = _build_schedule_lut()
 
-    stop_events_df["expectedFreq"] = stop_events_df.apply(get_expected_freq, axis=1)
+
+def _date_parts(timestamps):
+    """Split naive local datetimes into calendar and clock parts in one pass.
+
+    Every part comes from the same ``datetime64`` values (minutes, days and
+    months) instead of separate ``.dt`` accessors. Missing times get NaT in
+    ``day`` and -1 in the integer parts.
+
+    Args:
+        timestamps (pd.Series): Naive local datetimes
+
+    Returns:
+        dict: ``day`` (datetime64[D]) and integer arrays ``minute_of_day``,
+        ``weekday`` (Monday=0), ``month`` (January=0) and ``day_of_month``
+    """
+    times = timestamps.to_numpy("datetime64[ns]")
+    missing = np.isnat(times)
+    minutes = times.view("i8") // pd.Timedelta(minutes=1).value
+    days = times.astype("datetime64[D]")
+    months = days.astype("datetime64[M]")
+    # day 0 of the epoch, 1970-01-01, was a Thursday
+    weekday = (days.view("i8") + 3) % 7
+    day_of_month = (days - months.astype("datetime64[D]")).view("i8") + 1
+    return {
+        "day": days,
+        "minute_of_day": np.where(missing, -1, minutes % MINUTES_PER_DAY),
+        "weekday": np.where(missing, -1, weekday),
+        "month": np.where(missing, -1, months.view("i8") % 12),
+        "day_of_month": np.where(missing, -1, day_of_month),
+    }
+
+
+def assign_expected_frequencies(stop_events_df):
+    """Add expected frequency flags to stop events based on route and time."""
+    parts = _date_parts(stop_events_df["arrivalTime"])
+    minute_of_day, weekday = parts["minute_of_day"], parts["weekday"]
+    missing = minute_of_day < 0
+    # nullable int8 so rows without an arrival time stay missing
+    stop_events_df["arrivalHour"] = pd.arrays.IntegerArray(
+        (minute_of_day // 60).astype("int8"), missing
+    )
+    stop_events_df["arrivalWeekday"] = pd.arrays.IntegerArray(
+        weekday.astype("int8"), missing
+    )  # Monday=0, Sunday=6
+
+    # match each distinct route name once, then gather per row by code
+    routes = stop_events_df["routeName"].astype("category")
+    category_idx = pd.Index(SCHEDULE_MAP).get_indexer(routes.cat.categories.str.strip())
+    route_codes = routes.cat.codes.to_numpy()
+    route_idx = np.where(route_codes >= 0, category_idx[route_codes], -1)
+    service_minute = np.where(
+        minute_of_day >= EARLY_MORNING_CUTOFF_HOUR * 60,
+        minute_of_day,
+        minute_of_day + MINUTES_PER_DAY,
+    )
+
+    # one gather from the precomputed schedule table for every scheduled row
+    valid = (route_idx >= 0) & ~missing
+    # float32 holds every scheduled frequency exactly and still allows NaN
+    expected_freq = np.full(len(stop_events_df), np.nan, dtype="float32")
+    expected_freq[valid] = SCHEDULE_LUT[
+        route_idx[valid], weekday[valid], service_minute[valid]
+    ]
+    stop_events_df["expectedFreq"] = expected_freq
 
     return stop_events_df
 
 
-def calculate_route_mean_durations():
+@st.cache_data(show_spinner=False)
+def calculate_route_mean_durations(data_version):
     """Calculate mean stop durations by route.
 
+    Args:
+        data_version (int): Cache key, e.g. ``source_mtime()``
+
     Returns:
         pd.DataFrame: Mean stop durations by route
     """
-    data_stopevents = load_stop_events()
-    mean_durations = data_stopevents.groupby("routeName")["stopDurationSeconds"].mean()
+    _refresh_from_tsv(STOP_EVENTS_PATH)
+    # aggregate in Arrow on the two projected columns; no timestamp parsing
+    route_means = (
+        pq.read_table(STOP_EVENTS_PATH, columns=["routeName", "stopDurationSeconds"])
+        .group_by("routeName")
+        .aggregate([("stopDurationSeconds", "mean")])
+        .to_pandas()
+        .dropna(subset=["routeName"])
+    )
+    mean_durations = (
+        route_means.set_index("routeName")["stopDurationSeconds_mean"]
+        .rename("stopDurationSeconds")
+        .sort_index()
+    )
     result = mean_durations.to_frame().T
     return result
 
@@ -216,6 +479,13 @@ def get_time_block(hour):
         return "Night (9PM–5AM)"
 
 
+# time block labels in sorted order, and each hour's code into them
+TIME_BLOCKS = sorted({get_time_block(hour) for hour in range(24)})
+HOUR_TO_TIME_BLOCK_CODE = np.array(
+    [TIME_BLOCKS.index(get_time_block(hour)) for hour in range(24)], dtype="int8"
+)
+
+
 def add_time_blocks(df):
     """Add time block labels to the dataframe.
 
@@ -223,14 +493,21 @@ def add_time_blocks(df):
         df (pd.DataFrame): DataFrame with 'arrivalTime' column
 
     Returns:
-        pd.DataFrame: DataFrame with added 'hour' and 'timeBlock' columns
+        pd.DataFrame: DataFrame with added 'hour' and categorical 'timeBlock'
     """
     time_block_df = df.copy()
     time_block_df["hour"] = time_block_df["arrivalTime"].dt.hour
-    time_block_df["timeBlock"] = time_block_df["hour"].apply(get_time_block)
+    # missing hours fall through to the night block, as in get_time_block
+    hour_idx = time_block_df["hour"].fillna(0).astype(int).to_numpy()
+    time_block_df["timeBlock"] = pd.Categorical.from_codes(
+        HOUR_TO_TIME_BLOCK_CODE[hour_idx], categories=TIME_BLOCKS
+    )
     return time_block_df
 
 
+TRAFFIC_FLAGS = ["low", "mid", "high"]
+
+
 def add_traffic_flag(stop_events_df):
     """Adds a traffic flag (low, mid, high) to each stopName based on event frequency.
 
@@ -238,31 +515,27 @@ def add_traffic_flag(stop_events_df):
         stop_events_df (pd.DataFrame): Stop events data.
 
     Returns:
-        pd.DataFrame: Same dataframe with new 'trafficFlag' column.
+        pd.DataFrame: Same dataframe with new categorical 'trafficFlag' column.
     """
-    stop_counts = stop_events_df["stopName"].value_counts()
-    low_thresh = stop_counts.quantile(0.33)
-    mid_thresh = stop_counts.quantile(0.66)
-
-    def flag(count):
-        if count <= low_thresh:
-            return "low"
-        elif count <= mid_thresh:
-            return "mid"
-        else:
-            return "high"
-
-    flag_df = (
-        stop_counts.rename("eventCount")
-        .reset_index()
-        .rename(columns={"index": "stopName"})
+    stops = stop_events_df["stopName"].astype("category")
+    stop_codes = stops.cat.codes.to_numpy()
+    stop_counts = np.bincount(
+        stop_codes[stop_codes >= 0], minlength=len(stops.cat.categories)
     )
-    flag_df["trafficFlag"] = flag_df["eventCount"].apply(flag)
-
-    stop_events_df = stop_events_df.merge(
-        flag_df[["stopName", "trafficFlag"]], on="stopName", how="left"
+    if not stop_counts.any():
+        # no named stops to rank; every row keeps a missing flag
+        row_tiers = np.full(len(stop_codes), -1, dtype="int8")
+    else:
+        thresholds = np.quantile(stop_counts[stop_counts > 0], [0.33, 0.66])
+        # counts up to the first threshold are "low", up to the second "mid";
+        # each row then gathers its stop's tier by category code
+        stop_tiers = np.searchsorted(thresholds, stop_counts, side="left").astype(
+            "int8"
+        )
+        row_tiers = np.where(stop_codes >= 0, stop_tiers[stop_codes], -1)
+    return stop_events_df.assign(
+        trafficFlag=pd.Categorical.from_codes(row_tiers, categories=TRAFFIC_FLAGS)
     )
-    return stop_events_df
 
 
 def load_holdover_data():
@@ -302,104 +575,129 @@ def load_holdover_data():
             "Law",
             "60th/Ellis",
         ],
-        "duration": [
-            "6 minutes",
-            "7 minutes",
-            "5 minutes",
-            "4 minutes",
-            None,
-            "10 minutes",
-            "3 minutes",
-            "5 minutes",
-            None,
-            None,
-            None,
-            "3 minutes",
-            "7 minutes",
-            "6 minutes",
-            "6 minutes",
-        ],
+        # holdover minutes, 0 if the route has no holdover stop
+        "durationMinutes": np.array(
+            [6, 7, 5, 4, 0, 10, 3, 5, 0, 0, 0, 3, 7, 6, 6], dtype="int16"
+        ),
     }
 
     holdover_df = pd.DataFrame(data)
 
-    # add numeric minutes column (0 if no holdover)
-    holdover_df["durationMinutes"] = (
-        holdover_df["duration"]
-        .fillna("0 minutes")
-        .str.replace(" minutes", "", regex=False)
-        .astype(int)
-    )
+    # display-only label derived from the numeric column
+    holdover_df["duration"] = (
+        holdover_df["durationMinutes"].astype(str) + " minutes"
+    ).where(holdover_df["durationMinutes"] > 0)
 
     return holdover_df
 
 
+DAY_NAMES = [
+    "Monday",
+    "Tuesday",
+    "Wednesday",
+    "Thursday",
+    "Friday",
+    "Saturday",
+    "Sunday",
+]
+MONTH_NAMES = [
+    "January",
+    "February",
+    "March",
+    "April",
+    "May",
+    "June",
+    "July",
+    "August",
+    "September",
+    "October",
+    "November",
+    "December",
+]
+
+
 def time_extraction():
     """Extract month number, week number, and day of week."""
-    shuttle_data = load_stop_events_march()
-    shuttle_data["date"] = shuttle_data["arrivalTime"].dt.date
-    # extract the day of week (e.g., Mon, Tue...)
-    shuttle_data["week_day"] = shuttle_data["arrivalTime"].dt.day_name()
-    # extract month of the date
-    shuttle_data["month"] = shuttle_data["arrivalTime"].dt.month_name()
-    # extract day of the month
-    shuttle_data["day_of_month"] = shuttle_data["arrivalTime"].dt.day
-    # extract the hour of date
-    shuttle_data["hour"] = shuttle_data["arrivalTime"].dt.hour
-    # define week of month based on day ranges
-    shuttle_data["month_week"] = pd.cut(
-        shuttle_data["day_of_month"],
-        bins=[0, 7, 14, 21, 28, 31],
-        labels=[1, 2, 3, 4, 5],
-        right=True,
-    ).astype(int)
+    shuttle_data = load_stop_events_march(
+        columns=["routeName", "stopName", "arrivalTime", "passengerLoad"]
+    )
+    parts = _date_parts(shuttle_data["arrivalTime"])
+    shuttle_data["date"] = parts["day"]
+    # day of week and month as ordered categoricals over fixed name lists
+    shuttle_data["week_day"] = pd.Categorical.from_codes(
+        parts["weekday"], categories=DAY_NAMES, ordered=True
+    )
+    shuttle_data["month"] = pd.Categorical.from_codes(
+        parts["month"], categories=MONTH_NAMES, ordered=True
+    )
+    shuttle_data["day_of_month"] = pd.arrays.IntegerArray(
+        parts["day_of_month"].astype("int8"), parts["day_of_month"] < 0
+    )
+    shuttle_data["hour"] = pd.arrays.IntegerArray(
+        (parts["minute_of_day"] // 60).astype("int8"), parts["minute_of_day"] < 0
+    )
+    # week of month: days 1-7 are week 1, ..., days 29-31 fold into week 5
+    shuttle_data["month_week"] = np.minimum(
+        (shuttle_data["day_of_month"] - 1) // 7 + 1, 5
+    ).astype("Int8")
     return shuttle_data
 
 
 def aggregate_by_time(df):
     """Aggregate passenger load by month, week, weekday, and route."""
     agg_df = (
-        df.groupby(["month", "month_week", "week_day", "routeName", "date"])[
-            "passengerLoad"
-        ]
+        df.groupby(
+            ["month", "month_week", "week_day", "routeName", "date"], observed=True
+        )["passengerLoad"]
         .sum()
         .reset_index()
     )
-    day_order = [
-        "Monday",
-        "Tuesday",
-        "Wednesday",
-        "Thursday",
-        "Friday",
-        "Saturday",
-        "Sunday",
-    ]
-    agg_df["week_day"] = pd.Categorical(
-        agg_df["week_day"], categories=day_order, ordered=True
-    )
     return agg_df
 
 
-def get_route_level_ridership_vs_variance():
+@st.cache_data(show_spinner=False, persist="disk")
+def get_route_level_ridership_vs_variance(data_version):
     """Returns one row per route with:
 
     - average std dev of arrival time
     - average daily ridership (from passengerLoad)
+
+    Args:
+        data_version (str): Cache key, e.g. ``source_fingerprint()``
     """
-    data = load_stop_events()
+    data = assign_expected_frequencies(
+        load_stop_events(
+            columns=["routeName", "stopName", "arrivalTime", "passengerLoad"]
+        )
+    )
     _, variances, _ = process_arrival_times(data)
     route_variance = (
-        variances.groupby("routeName")["arrival_stdev"].mean().reset_index()
-    )
-    data["date"] = data["arrivalTime"].dt.date
-    daily_ridership = (
-        data.groupby(["routeName", "date"])["passengerLoad"].sum().reset_index()
-    )
-    avg_daily_ridership = (
-        daily_ridership.groupby("routeName")["passengerLoad"]
+        variances.groupby("routeName", observed=True)["arrival_stdev"]
         .mean()
         .reset_index()
-        .rename(columns={"passengerLoad": "avg_daily_boardings"})
+    )
+
+    # daily totals per (route, day), then each route's mean over its days,
+    # as two bincounts over integer keys
+    route_codes, routes = pd.factorize(data["routeName"])
+    day_codes, days = pd.factorize(_date_parts(data["arrivalTime"])["day"])
+    valid = (route_codes >= 0) & (day_codes >= 0)
+    route_day_codes, route_days = pd.factorize(
+        route_codes[valid] * len(days) + day_codes[valid]
+    )
+    daily_totals = np.bincount(
+        route_day_codes,
+        weights=data["passengerLoad"].fillna(0).to_numpy()[valid],
+    )
+    day_routes = route_days // len(days)
+    avg_daily_ridership = pd.DataFrame(
+        {
+            "routeName": routes,
+            "avg_daily_boardings": np.bincount(
+                day_routes, weights=daily_totals, minlength=len(routes)
+            )
+            / np.bincount(day_routes, minlength=len(routes)),
+        }
     )
     result = route_variance.merge(avg_daily_ridership, on="routeName")
     return result